@@ -1,7 +1,6 @@
 import seaborn as sns
 import matplotlib.pyplot as plt
 import numpy as np
-import pandas as pd
 import warnings
 
 
@@ -160,8 +159,8 @@ def paired_heatmaps(ranks, microbes_table, metabolites_table, microbe_metadata,
     else:
         features = []
 
-    microbes_table = microbes_table.to_dataframe().T
-    metabolites_table = metabolites_table.to_dataframe().T
+    microbes_table = microbes_table.to_dataframe(dense=True).T
+    metabolites_table = metabolites_table.to_dataframe(dense=True).T
 
     # optionally normalize tables
     if normalize != 'None':
@@ -174,8 +173,9 @@ def paired_heatmaps(ranks, microbes_table, metabolites_table, microbe_metadata,
     # find top k microbes (highest relative abundances)
     if top_k_microbes is not None:
         # select top relative abundances
-        top_microbes = microbes_table.apply(
-            lambda x: x / x.sum(), axis=1).sum().sort_values(ascending=False)
+        top_microbes = microbes_table.div(
+            microbes_table.sum(axis=1), axis=0).sum().sort_values(
+                ascending=False)
         # TODO: add option for selecting top_k_microbes by rank
         # top_microbes = ranks.max(axis=1).sort_values(ascending=False)
         top_microbes = top_microbes[:top_k_microbes].index
@@ -185,8 +185,8 @@ def paired_heatmaps(ranks, microbes_table, metabolites_table, microbe_metadata,
 
     # select samples in which microbes are most abundant feature
     if keep_top_samples:
-        select_microbes = microbes_table[microbes_table.apply(
-            pd.Series.idxmax, axis=1).isin(features)]
+        select_microbes = microbes_table[
+            microbes_table.idxmax(axis=1).isin(features)]
 
     # filter select microbes from microbe table and sort by abundance
     sort_orders = [False] + [True] * (len(features) - 1)
@@ -196,9 +196,14 @@ def paired_heatmaps(ranks, microbes_table, metabolites_table, microbe_metadata,
 
     # find top K metabolites (highest positive ranks) for each microbe
     if top_k_metabolites != 'all':
-        top_metabolites = dict.fromkeys(m for x in [ranks.loc[f].sort_values(
-            ascending=False)[:top_k_metabolites].index
-            for f in features] for m in x).keys()
+        # partial selection of the k largest ranks per microbe, then
+        # order only those k entries by decreasing rank
+        k = min(top_k_metabolites, ranks.shape[1])
+        vals = ranks.loc[features].values
+        idx = np.argpartition(-vals, k - 1, axis=1)[:, :k]
+        order = np.argsort(-np.take_along_axis(vals, idx, axis=1), axis=1)
+        idx = np.take_along_axis(idx, order, axis=1)
+        top_metabolites = dict.fromkeys(ranks.columns[idx.ravel()]).keys()
         select_metabolites = metabolites_table[top_metabolites]
     else:
         select_metabolites = metabolites_table
@@ -330,9 +335,10 @@ def _normalize_table(table, method):
     elif 'row' in method:
         axis = 1
     if 'z_score' in method:
-        res = table.apply(lambda x: (x - x.mean()) / x.std(), axis=axis)
+        res = table.sub(table.mean(axis=axis), axis=1 - axis).div(
+            table.std(axis=axis), axis=1 - axis)
     elif 'rel' in method:
-        res = table.apply(lambda x: x / x.sum(), axis=axis)
+        res = table.div(table.sum(axis=axis), axis=1 - axis)
     elif method == 'log10':
-        res = table.apply(lambda x: np.log10(x + 1))
+        res = np.log10(table + 1)
     return res.fillna(0)
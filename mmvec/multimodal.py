@@ -65,6 +65,10 @@ class MMvec(object):
             Test output metabolite table.  This is mainly for cross validation.
         """
         self.session = session
+        # row-sliced DataFrame values are frequently F-ordered float64,
+        # which forces an extra copy and cast when handed to tensorflow
+        trainY = np.ascontiguousarray(trainY, dtype=np.float32)
+        testY = np.ascontiguousarray(testY, dtype=np.float32)
         self.nnz = len(trainX.data)
         self.d1 = trainX.shape[1]
         self.d2 = trainY.shape[1]
@@ -74,14 +78,16 @@ class MMvec(object):
         # https://github.com/tensorflow/tensorflow/issues/18058
         with tf.device('/cpu:0'):
             X_ph = tf.SparseTensor(
-                indices=np.array([trainX.row,  trainX.col]).T,
-                values=trainX.data,
+                indices=np.column_stack(
+                    (trainX.row, trainX.col)).astype(np.int64),
+                values=trainX.data.astype(np.float32, copy=False),
                 dense_shape=trainX.shape)
             Y_ph = tf.constant(trainY, dtype=tf.float32)
 
             X_holdout = tf.SparseTensor(
-                indices=np.array([testX.row,  testX.col]).T,
-                values=testX.data,
+                indices=np.column_stack(
+                    (testX.row, testX.col)).astype(np.int64),
+                values=testX.data.astype(np.float32, copy=False),
                 dense_shape=testX.shape)
             Y_holdout = tf.constant(testY, dtype=tf.float32)
 
@@ -206,13 +212,19 @@ class MMvec(object):
         tf.global_variables_initializer().run()
 
     def ranks(self):
-        modelU = np.hstack(
-            (np.ones((self.U.shape[0], 1)), self.Ubias, self.U))
-        modelV = np.vstack(
-            (self.Vbias, np.ones((1, self.V.shape[1])), self.V))
-
-        res = np.hstack((np.zeros((self.U.shape[0], 1)), modelU @ modelV))
-        res = res - res.mean(axis=1).reshape(-1, 1)
+        # [1, Ubias, U] @ [Vbias; 1; V] expands to U @ V + Ubias + Vbias,
+        # so the augmented parameter matrices never need to be built.
+        # The product is written straight into the output buffer, next
+        # to the zero column of the reference metabolite, and is computed
+        # in float64 like the rest of the ranks.
+        res = np.empty((self.U.shape[0], self.V.shape[1] + 1))
+        res[:, 0] = 0
+        uv = res[:, 1:]
+        np.matmul(self.U.astype(np.float64), self.V.astype(np.float64),
+                  out=uv)
+        uv += self.Ubias
+        uv += self.Vbias
+        res -= res.mean(axis=1, keepdims=True)
         return res
 
     def fit(self, epoch=10, summary_interval=1000, checkpoint_interval=3600,
@@ -246,20 +258,14 @@ class MMvec(object):
             if now - last_summary_time > summary_interval:
 
                 res = self.session.run(
-                    [self.train, self.merged, self.log_loss, self.cv,
-                     self.qUmain, self.qUbias,
-                     self.qVmain, self.qVbias]
+                    [self.train, self.merged, self.log_loss, self.cv]
                 )
-                train_, summary, loss, cv, rU, rUb, rV, rVb = res
+                train_, summary, loss, cv = res
                 self.writer.add_summary(summary, i)
                 last_summary_time = now
             else:
-                res = self.session.run(
-                    [self.train, self.log_loss,
-                     self.qUmain, self.qUbias,
-                     self.qVmain, self.qVbias]
-                )
-                train_, loss, rU, rUb, rV, rVb = res
+                res = self.session.run([self.train, self.log_loss])
+                train_, loss = res
                 losses.append(loss)
                 cvs.append(cv)
                 cv = None
@@ -272,9 +278,10 @@ class MMvec(object):
                            global_step=i)
                 last_checkpoint_time = now
 
-        self.U = rU
-        self.V = rV
-        self.Ubias = rUb
-        self.Vbias = rVb
+        # only fetch the parameters once training has finished, rather
+        # than copying them out of the session on every iteration
+        self.U, self.Ubias, self.V, self.Vbias = self.session.run(
+            [self.qUmain, self.qUbias, self.qVmain, self.qVbias]
+        )
 
         return losses, cvs
@@ -0,0 +1,73 @@
+import os
+import shutil
+import tempfile
+import unittest
+import importlib.util
+from importlib.machinery import SourceFileLoader
+from unittest import mock
+import pandas as pd
+from click.testing import CliRunner
+from skbio.util import get_data_path
+
+
+script_path = os.path.join(os.path.dirname(__file__),
+                           '..', '..', 'scripts', 'mmvec')
+has_parquet = any(importlib.util.find_spec(e)
+                  for e in ('pyarrow', 'fastparquet'))
+
+
+def load_cli():
+    loader = SourceFileLoader('mmvec_cli', script_path)
+    spec = importlib.util.spec_from_loader('mmvec_cli', loader)
+    cli = importlib.util.module_from_spec(spec)
+    loader.exec_module(cli)
+    return cli
+
+
+@unittest.skipUnless(os.path.exists(script_path),
+                     'mmvec script is not available')
+class TestRanksFormat(unittest.TestCase):
+
+    def setUp(self):
+        self.cli = load_cli()
+        self.runner = CliRunner()
+        self.tmpdir = tempfile.mkdtemp()
+        self.args = [
+            'paired-omics',
+            '--microbe-file', get_data_path('soil_microbes.biom'),
+            '--metabolite-file', get_data_path('soil_metabolites.biom'),
+            '--num-testing-examples', '2',
+            '--min-feature-count', '1',
+            '--epochs', '1',
+            '--latent-dim', '1',
+            '--summary-dir', self.tmpdir
+        ]
+
+    def tearDown(self):
+        shutil.rmtree(self.tmpdir)
+
+    def test_parquet_without_engine(self):
+        with mock.patch.object(self.cli.importlib.util, 'find_spec',
+                               return_value=None):
+            res = self.runner.invoke(
+                self.cli.mmvec, ['paired-omics', '--microbe-file', 'missing',
+                                 '--ranks-format', 'parquet'])
+        # rejected while parsing options, before any table is loaded
+        self.assertEqual(res.exit_code, 2)
+        self.assertIn('requires pyarrow or fastparquet', res.output)
+
+    @unittest.skipUnless(has_parquet, 'no parquet engine installed')
+    def test_parquet(self):
+        ranks_file = os.path.join(self.tmpdir, 'ranks.parquet')
+        res = self.runner.invoke(
+            self.cli.mmvec, self.args + ['--ranks-format', 'parquet',
+                                         '--ranks-file', ranks_file])
+        self.assertEqual(res.exit_code, 0, res.output)
+        ranks = pd.read_parquet(ranks_file)
+        self.assertEqual(ranks.index.name, 'featureid')
+        self.assertGreater(ranks.shape[0], 0)
+        self.assertGreater(ranks.shape[1], 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
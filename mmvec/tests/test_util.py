@@ -2,7 +2,7 @@ import unittest
 import numpy as np
 import pandas as pd
 from biom import Table
-from mmvec.util import rank_hits, split_tables
+from mmvec.util import rank_hits, split_tables, format_params
 import numpy.testing as npt
 import pandas.util.testing as pdt
 
@@ -33,6 +33,80 @@ class TestRankHits(unittest.TestCase):
 
         pdt.assert_frame_equal(res, exp)
 
+    def test_rank_hits_neg(self):
+        ranks = pd.DataFrame(
+            [
+                [1., 4., 1.5, 5., 7.],
+                [2., 6., 9., 3., 8.],
+                [2., 2.5, 6., 8., 4.]
+            ],
+            index=['OTU_1', 'OTU_2', 'OTU_3'],
+            columns=['MS_1', 'MS_2', 'MS_3', 'MS_4', 'MS_5']
+        )
+        res = rank_hits(ranks, k=2, pos=False)
+        exp = pd.DataFrame(
+            [
+                ['OTU_1', 1., 'MS_1'],
+                ['OTU_2', 2., 'MS_1'],
+                ['OTU_3', 2., 'MS_1'],
+                ['OTU_1', 1.5, 'MS_3'],
+                ['OTU_2', 3., 'MS_4'],
+                ['OTU_3', 2.5, 'MS_2']
+            ], columns=['src', 'rank', 'dest'],
+        )
+
+        pdt.assert_frame_equal(res, exp)
+
+    def test_rank_hits_zero(self):
+        ranks = pd.DataFrame(
+            [
+                [1., 4., 1.5],
+                [2., 6., 9.]
+            ],
+            index=['OTU_1', 'OTU_2'],
+            columns=['MS_1', 'MS_2', 'MS_3']
+        )
+        for pos in (True, False):
+            res = rank_hits(ranks, k=0, pos=pos)
+            self.assertEqual(res.shape, (0, 3))
+            self.assertEqual(list(res.columns), ['src', 'rank', 'dest'])
+
+
+class TestFormatParams(unittest.TestCase):
+
+    def test_format_params(self):
+        vals = np.array([[1., 2.], [3., 4.], [5., 6.]])
+        res = format_params(vals, ['PC0', 'PC1'], ['a', 'b', 'c'],
+                            'microbe')
+        exp = pd.DataFrame(
+            [
+                ['a', 'PC0', 'microbe', 1.],
+                ['b', 'PC0', 'microbe', 3.],
+                ['c', 'PC0', 'microbe', 5.],
+                ['a', 'PC1', 'microbe', 2.],
+                ['b', 'PC1', 'microbe', 4.],
+                ['c', 'PC1', 'microbe', 6.]
+            ], columns=['feature_id', 'axis', 'embed_type', 'values']
+        )
+        pdt.assert_frame_equal(res, exp)
+
+    def test_format_params_bias(self):
+        vals = np.array([1., 2., 3.])
+        res = format_params(vals, ['bias'], ['a', 'b', 'c'], 'metabolite')
+        exp = pd.DataFrame(
+            [
+                ['a', 'bias', 'metabolite', 1.],
+                ['b', 'bias', 'metabolite', 2.],
+                ['c', 'bias', 'metabolite', 3.]
+            ], columns=['feature_id', 'axis', 'embed_type', 'values']
+        )
+        pdt.assert_frame_equal(res, exp)
+
+    def test_format_params_bad_shape(self):
+        vals = np.array([[1., 2., 3.], [4., 5., 6.]])
+        with self.assertRaises(ValueError):
+            format_params(vals, ['PC0', 'PC1'], ['a', 'b', 'c'], 'microbe')
+
 
 class TestSplitTables(unittest.TestCase):
 
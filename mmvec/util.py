@@ -1,6 +1,5 @@
 import numpy as np
 import pandas as pd
-from sklearn.utils import check_random_state
 from skbio.stats.composition import ilr_inv
 from skbio.stats.composition import clr_inv as softmax
 
@@ -46,7 +45,7 @@ def random_multimodal(num_microbes=20, num_metabolites=100, num_samples=100,
     sigmaV : float
        Standard deviation of metabolite output projection
        coefficient distribution
-    seed : float
+    seed : int, np.random.Generator or np.random.RandomState
        Random seed
 
     Returns
@@ -56,7 +55,10 @@ def random_multimodal(num_microbes=20, num_metabolites=100, num_samples=100,
     metabolite_counts : pd.DataFrame
        Count table of metabolite counts
     """
-    state = check_random_state(seed)
+    if isinstance(seed, np.random.RandomState):
+        # default_rng doesn't accept legacy RandomState instances
+        seed = seed.randint(np.iinfo(np.int32).max)
+    state = np.random.default_rng(seed)
     # only have two coefficients
     beta = state.normal(uB, sigmaB, size=(2, num_microbes))
 
@@ -83,16 +85,17 @@ def random_multimodal(num_microbes=20, num_metabolites=100, num_samples=100,
 
     phi = np.hstack((np.zeros((num_microbes, 1)), U_ @ V_))
     probs = softmax(phi)
-    microbe_counts = np.zeros((num_samples, num_microbes))
-    metabolite_counts = np.zeros((num_samples, num_metabolites))
     n1 = microbe_total
     n2 = metabolite_total // microbe_total
-    for n in range(num_samples):
-        otu = state.multinomial(n1, microbes[n, :])
-        for i in range(num_microbes):
-            ms = state.multinomial(otu[i] * n2, probs[i, :])
-            metabolite_counts[n, :] += ms
-        microbe_counts[n, :] += otu
+    otus = np.vstack([
+        state.multinomial(n1, microbes[n, :]) for n in range(num_samples)
+    ])
+    # Generator.multinomial broadcasts over an array of totals, so the
+    # metabolites produced by one microbe are drawn for all samples at once
+    metabolite_counts = np.zeros((num_samples, num_metabolites))
+    for i in range(num_microbes):
+        metabolite_counts += state.multinomial(otus[:, i] * n2, probs[i, :])
+    microbe_counts = otus.astype(np.float64)
 
     otu_ids = ['OTU_%d' % d for d in range(microbe_counts.shape[1])]
     ms_ids = ['metabolite_%d' % d for d in range(metabolite_counts.shape[1])]
@@ -144,35 +147,51 @@ def split_tables(otu_table, metabolite_table,
        Testing set of metabolites
     Notes
     -----
-    There is an inefficient conversion from a sparse matrix to a
-    dense matrix.  This may become a bottleneck later.
+    Samples are aligned and rare microbes are filtered out on the sparse
+    tables, so only the retained data is converted to a dense matrix.
+    This may still become a bottleneck for very large tables.
     """
-    microbes_df = otu_table.to_dataframe().T
-    metabolites_df = metabolite_table.to_dataframe().T
-
-    microbes_df, metabolites_df = microbes_df.align(
-        metabolites_df, axis=0, join='inner'
-    )
+    # align samples across both tables
+    sample_ids = otu_table.ids(axis='sample')
+    sample_ids = sample_ids[
+        np.isin(sample_ids, metabolite_table.ids(axis='sample'))]
+    otu_table = otu_table.filter(sample_ids, axis='sample', inplace=False)
+    metabolite_table = metabolite_table.filter(
+        sample_ids, axis='sample', inplace=False).sort_order(
+            sample_ids, axis='sample')
 
     # filter out microbes that don't appear in many samples
-    idx = (microbes_df > 0).sum(axis=0) >= min_samples
-    microbes_df = microbes_df.loc[:, idx]
+    counts = np.asarray((otu_table.matrix_data > 0).sum(axis=1)).ravel()
+    otu_table = otu_table.filter(
+        otu_table.ids(axis='observation')[counts >= min_samples],
+        axis='observation', inplace=False)
+
+    microbes_df = pd.DataFrame(
+        otu_table.matrix_data.T.toarray(),
+        index=otu_table.ids(axis='sample'),
+        columns=otu_table.ids(axis='observation'))
+    metabolites_df = pd.DataFrame(
+        metabolite_table.matrix_data.T.toarray(),
+        index=metabolite_table.ids(axis='sample'),
+        columns=metabolite_table.ids(axis='observation'))
+
     if metadata is None or training_column is None:
-        sample_ids = set(np.random.choice(microbes_df.index, size=num_test))
-        sample_ids = np.array([(x in sample_ids) for x in microbes_df.index])
+        n = len(microbes_df)
+        perm = np.random.permutation(n)
+        sample_ids = np.zeros(n, dtype=bool)
+        sample_ids[perm[:num_test]] = True
     else:
         if len(set(metadata[training_column]) & {'Train', 'Test'}) == 0:
             raise ValueError(
                 "Training column must only specify `Train` and `Test` values"
             )
         idx = metadata.loc[metadata[training_column] != 'Train'].index
-        sample_ids = set(idx)
-        sample_ids = np.array([(x in sample_ids) for x in microbes_df.index])
+        sample_ids = microbes_df.index.isin(idx)
 
-    train_microbes = microbes_df.loc[~sample_ids]
-    test_microbes = microbes_df.loc[sample_ids]
-    train_metabolites = metabolites_df.loc[~sample_ids]
-    test_metabolites = metabolites_df.loc[sample_ids]
+    train_microbes = microbes_df.iloc[~sample_ids]
+    test_microbes = microbes_df.iloc[sample_ids]
+    train_metabolites = metabolites_df.iloc[~sample_ids]
+    test_metabolites = metabolites_df.iloc[sample_ids]
     if len(train_microbes) == 0 or len(train_microbes.columns) == 0:
         raise ValueError('All of the training data has been filtered out. '
                          'Adjust the `--min-feature-count` accordingly.')
@@ -197,34 +216,22 @@ def rank_hits(ranks, k, pos=True):
     edges : pd.DataFrame
        List of edges along with corresponding ranks.
     """
-    axis = 1
-
-    def sort_f(x):
-        if pos:
-            return [
-                ranks.columns[i] for i in np.argsort(x)[-k:]
-            ]
-        else:
-            return [
-                ranks.columns[i] for i in np.argsort(x)[:k]
-            ]
-
-    idx = ranks.index
-    topk = ranks.apply(sort_f, axis=axis).values
-    topk = pd.DataFrame([x for x in topk], index=idx)
-    top_hits = topk.reset_index()
-    top_hits = top_hits.rename(columns={'index': 'src'})
-    edges = pd.melt(
-        top_hits, id_vars=['src'],
-        var_name='rank',
-        value_vars=list(range(k)),
-        value_name='dest')
-
-    # fill in actual ranks
-    for i in edges.index:
-        src = edges.loc[i, 'src']
-        dest = edges.loc[i, 'dest']
-        edges.loc[i, 'rank'] = ranks.loc[src, dest]
+    vals = ranks.values
+    # partial selection of the k extreme entries per row, followed by
+    # sorting only those k entries in increasing order
+    if pos:
+        idx = np.argpartition(vals, -k, axis=1)[:, vals.shape[1] - k:]
+    else:
+        idx = np.argpartition(vals, k - 1, axis=1)[:, :k]
+    order = np.take_along_axis(vals, idx, axis=1).argsort(axis=1)
+    idx = np.take_along_axis(idx, order, axis=1)
+
+    # one edge per (src, dest) pair, grouped by neighbor position
+    edges = pd.DataFrame({
+        'src': np.tile(ranks.index.values, k),
+        'rank': np.take_along_axis(vals, idx, axis=1).ravel(order='F'),
+        'dest': ranks.columns.values[idx.ravel(order='F')]
+    })
     edges['rank'] = edges['rank'].astype(np.float64)
     return edges
 
@@ -261,14 +268,21 @@ def format_params(vals, colnames, rownames,
         values : float
             Corresponding model parameters
     """
-    df = pd.DataFrame(vals, columns=colnames, index=rownames)
-    df = df.reset_index()
-    df = df.rename(columns={'index': 'feature_id'})
-    df = pd.melt(df, id_vars=['feature_id'],
-                 var_name='axis', value_name='values')
-
-    df['embed_type'] = embed_name
-
+    # build the long format directly (column-major, as pd.melt would)
+    n, m = len(rownames), len(colnames)
+    vals = np.asarray(vals)
+    if vals.ndim == 1:
+        vals = vals[:, None]
+    if vals.shape != (n, m):
+        raise ValueError(
+            'Shape of values %s does not match the %d row names and '
+            '%d column names.' % (vals.shape, n, m))
+    df = pd.DataFrame({
+        'feature_id': np.tile(np.asarray(rownames), m),
+        'axis': np.repeat(np.asarray(colnames, dtype=object), n),
+        'embed_type': embed_name,
+        'values': vals.ravel(order='F')
+    })
     return df[['feature_id', 'axis', 'embed_type', 'values']]
 
 
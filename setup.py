@@ -53,7 +53,7 @@ setup(name='mmvec',
       scripts=glob('scripts/mmvec'),
       install_requires=[
           'biom-format',
-          'numpy >= 1.9.2',
+          'numpy >= 1.17',
           'pandas <= 0.25.3',
           'scipy >= 0.15.1',
           'nose >= 1.3.7',